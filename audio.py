@@ -29,8 +29,9 @@ config.json (claves usadas):
   "tts_voice_hector": "onyx",
   "tts_voice_aura": "sage",
   "tts_format": "wav",         # formato final del archivo
-  "tts_chunk_format": "mp3",   # 'mp3' recomendado para chunks
+  "tts_chunk_format": "wav",   # 'wav' recomendado: evita el decode MP3 al concatenar
   "tts_sample_rate": 24000,
+  "tts_gap_ms": 0,             # silencio entre bloques (0 = desactivado)
 
   "tts_allow_emojis": false,
   "tts_whitelist_emojis": ["😂","😍","😲","😏","😉","🙏","🔥"],
@@ -44,20 +45,40 @@ from __future__ import annotations
 from dotenv import load_dotenv
 load_dotenv(".env")
 
+import functools
+import hashlib
 import json
 import os
+import random
 import re
 import shutil
 import subprocess
 import sys
+import tempfile
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Tuple, Optional, Dict, Any
+from typing import List, Tuple, Optional, Dict, Any, Iterable, Union
+
+# Serialización JSON: orjson si está instalado (emite bytes directamente y es
+# varias veces más rápido); stdlib como fallback sin dependencia nueva.
+try:
+    import orjson
+
+    def _json_dumps_bytes(obj: Any) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+except Exception:  # pragma: no cover
+    def _json_dumps_bytes(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
 
 # ---------------------------------------------------------------------
 # Utilidades generales
 # ---------------------------------------------------------------------
 
-def _read_config(path: Path = Path("config.json")) -> dict:
+@functools.lru_cache(maxsize=4)
+def _read_config_cached(path_str: str) -> dict:
+    path = Path(path_str)
     if not path.exists():
         return {}
     try:
@@ -65,9 +86,14 @@ def _read_config(path: Path = Path("config.json")) -> dict:
     except Exception:
         return {}
 
+def _read_config(path: Path = Path("config.json")) -> dict:
+    return _read_config_cached(os.fspath(path))
+
+@functools.lru_cache(maxsize=8)
 def _which(bin_name: str) -> Optional[str]:
-    from shutil import which as _which
-    return _which(bin_name)
+    # Memoizado: _ffprobe_duration lo consulta una vez por chunk y el PATH
+    # no cambia durante la ejecución.
+    return shutil.which(bin_name)
 
 def _ensure_parent(p: Path) -> None:
     p.parent.mkdir(parents=True, exist_ok=True)
@@ -86,13 +112,27 @@ def _load_openai_client(api_key: Optional[str] = None):
     """
     Carga el cliente oficial de OpenAI (SDK >= 1.0).
     Soporta streaming a fichero si está disponible.
+    El pool httpx se dimensiona para la síntesis concurrente: con keep-alive
+    suficiente, el handshake TLS solo se paga en los primeros chunks.
     """
     try:
         from openai import OpenAI
         key = api_key or os.getenv("OPENAI_API_KEY")
         if not key:
             raise RuntimeError("Falta OPENAI_API_KEY (parámetro o variable de entorno).")
-        return OpenAI(api_key=key)
+        try:
+            import httpx
+            http_client = httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=32,
+                    max_keepalive_connections=32,
+                    keepalive_expiry=60.0,
+                ),
+                timeout=60.0,
+            )
+            return OpenAI(api_key=key, http_client=http_client)
+        except Exception:
+            return OpenAI(api_key=key)  # pool por defecto si httpx no coopera
     except Exception as e:
         raise RuntimeError(f"No se pudo cargar OpenAI SDK: {e}")
 
@@ -106,34 +146,42 @@ EMOJI_RANGES = [
     (0x1F900, 0x1F9FF),  # Supplemental symbols
 ]
 
-def _is_emoji_char(ch: str) -> bool:
-    o = ord(ch)
-    for a, b in EMOJI_RANGES:
-        if a <= o <= b:
-            return True
-    return False
+# Clase de caracteres compilada una sola vez: el escaneo ocurre en C, no en un
+# bucle Python por codepoint.
+_EMOJI_RE = re.compile("[" + "".join(f"{chr(a)}-{chr(b)}" for a, b in EMOJI_RANGES) + "]")
+
+# Tabla de borrado para str.translate: un solo pase en C sobre el buffer unicode,
+# más rápido que regex.sub para el caso "quitar todos". Se construye una vez.
+_EMOJI_DELETE = dict.fromkeys(
+    (cp for a, b in EMOJI_RANGES for cp in range(a, b + 1)), None
+)
 
 def _filter_emojis(text: str, allow: bool, whitelist: List[str], max_per_sentence: int = 1) -> str:
     if not allow:
         # Quita todos los emojis
-        return "".join(ch for ch in text if not _is_emoji_char(ch))
+        return text.translate(_EMOJI_DELETE)
+
+    # Caso común: sin emojis no hay nada que filtrar ni que partir en frases.
+    if not _EMOJI_RE.search(text):
+        return text
 
     # Mantener solo whitelist y máx. 1 por frase
+    wl = frozenset(whitelist)
+
     def process_chunk(chunk: str) -> str:
-        out = []
         count = 0
-        for ch in chunk:
-            if _is_emoji_char(ch):
-                if ch in whitelist and count < max_per_sentence:
-                    out.append(ch)
-                    count += 1
-                else:
-                    continue
-            else:
-                out.append(ch)
-        return "".join(out)
-
-    parts = re.split(r'([\.!?]\s+|\n+)', text)
+
+        def repl(m: "re.Match[str]") -> str:
+            nonlocal count
+            ch = m.group(0)
+            if ch in wl and count < max_per_sentence:
+                count += 1
+                return ch
+            return ""
+
+        return _EMOJI_RE.sub(repl, chunk)
+
+    parts = _SENT_SPLIT_RE.split(text)
     buff = []
     for i, part in enumerate(parts):
         if i % 2 == 0:
@@ -143,6 +191,14 @@ def _filter_emojis(text: str, allow: bool, whitelist: List[str], max_per_sentenc
     return "".join(buff)
 
 _TAG_BRACKETS = re.compile(r"\[[^\]]+\]")
+_SENT_SPLIT_RE = re.compile(r"([\.!?]\s+|\n+)")      # frases (conserva separadores)
+_WS_RE = re.compile(r"\s{2,}")                        # espacios repetidos
+_PUNCT_RE = re.compile(r"\s+([,;:\.\?!])")            # espacio antes de signos
+_OPEN_PUNCT_RE = re.compile(r"([\(¿¡])\s+")           # espacio tras apertura
+_SPEAKER_RE = re.compile(r"^([^:]{1,40}):\s*(.*)$")   # "Orador: texto"
+# Cualquier cosa que _clean_for_tts tendría que tocar: etiqueta, espacios
+# repetidos, espacio antes de signo o tras apertura. Un solo scan en C.
+_CLEAN_TARGETS_RE = re.compile(r"\[|\s{2,}|\s[,;:\.\?!]|[\(¿¡]\s")
 
 def _clean_for_tts(text: str, allow_emojis: bool, emoji_whitelist: List[str]) -> str:
     """
@@ -151,12 +207,16 @@ def _clean_for_tts(text: str, allow_emojis: bool, emoji_whitelist: List[str]) ->
     - Filtra emojis (todos, o 1/whitelist por frase).
     """
     t = text.strip()
+    # Fast path: la mayoría de líneas no traen etiquetas, emojis ni espaciado
+    # raro; dos búsquedas baratas evitan las cinco pasadas de limpieza.
+    if not _CLEAN_TARGETS_RE.search(t) and not _EMOJI_RE.search(t):
+        return t.strip(" ,;:")
     t = _TAG_BRACKETS.sub("", t)
     t = _filter_emojis(t, allow_emojis, emoji_whitelist, max_per_sentence=1)
     # Espacios / puntuación
-    t = re.sub(r"\s{2,}", " ", t)
-    t = re.sub(r"\s+([,;:\.\?!])", r"\1", t)  # sin espacio antes de signos
-    t = re.sub(r"([\(¿¡])\s+", r"\1", t)
+    t = _WS_RE.sub(" ", t)
+    t = _PUNCT_RE.sub(r"\1", t)  # sin espacio antes de signos
+    t = _OPEN_PUNCT_RE.sub(r"\1", t)
     t = t.strip(" ,;:")
     return t
 
@@ -164,52 +224,58 @@ def _clean_for_tts(text: str, allow_emojis: bool, emoji_whitelist: List[str]) ->
 # Parse del transcript (string)
 # ---------------------------------------------------------------------
 
-def _parse_transcript_from_text(transcript_text: str, presenter: str, guest: str) -> List[Tuple[str, str]]:
+def _parse_transcript_from_text(transcript_text: Union[str, Iterable[str]], presenter: str, guest: str) -> List[Tuple[str, str]]:
     """
-    Recibe el guion en texto plano y devuelve lista de (role, text),
-    donde role ∈ {"NARRATOR","HECTOR","AURA"}.
+    Recibe el guion (string o iterable de líneas, p. ej. un fichero abierto)
+    y devuelve lista de (role, text), donde role ∈ {"NARRATOR","HECTOR","AURA"}.
     - Detecta 'COLD OPEN' como narrador.
     - Acepta 'Hector' sin tilde.
     - Junta líneas consecutivas del mismo role para evitar microcortes.
+    Consume las líneas según llegan, sin materializar una lista intermedia.
     """
     raw = transcript_text or ""
-    lines = [l.strip() for l in raw.splitlines() if l.strip()]
-
-    def who(speaker: str) -> Optional[str]:
-        s = speaker.strip().lower().replace("é", "e")
-        p = presenter.strip().lower().replace("é", "e")
-        g = guest.strip().lower()
-        if s in ("cold open", "coldopen", "intro", "narrador", "narration"):
-            return "NARRATOR"
-        if s == p:
-            return "HECTOR"
-        if s == g:
-            return "AURA"
-        if s == "hector":
-            return "HECTOR"
-        if s == "aura":
-            return "AURA"
-        return None
+    lines = raw.splitlines() if isinstance(raw, str) else raw
+
+    def _norm(s: str) -> str:
+        # casefold > lower: cubre mayúsculas "raras" (p. ej. HÉCTOR en ß-style)
+        return s.strip().casefold().replace("é", "e")
+
+    # Mapa de roles precomputado: una búsqueda de dict por línea en vez de
+    # re-normalizar presenter/guest y encadenar comparaciones en cada llamada.
+    role_map: Dict[str, str] = {
+        "cold open": "NARRATOR", "coldopen": "NARRATOR", "intro": "NARRATOR",
+        "narrador": "NARRATOR", "narration": "NARRATOR",
+        "hector": "HECTOR", "aura": "AURA",
+        _norm(presenter): "HECTOR",
+        _norm(guest): "AURA",
+    }
 
     pairs: List[Tuple[str, str]] = []
     for l in lines:
-        m = re.match(r"^([^:]{1,40}):\s*(.*)$", l)  # "Orador: texto"
+        l = l.strip()
+        if not l:
+            continue
+        m = _SPEAKER_RE.match(l)
         if not m:
             # fallback: narrador (suele ocurrir con COLD OPEN sin prefijo)
             pairs.append(("NARRATOR", l))
             continue
-        spk, text = m.group(1).strip(), m.group(2).strip()
-        role = who(spk) or "NARRATOR"
+        spk, text = m.group(1), m.group(2).strip()
+        role = role_map.get(_norm(spk), "NARRATOR")
         pairs.append((role, text))
 
-    # Unir consecutivos del mismo role
-    merged: List[Tuple[str, str]] = []
+    # Unir consecutivos del mismo role: una sola llamada TTS por tirada en vez
+    # de pagar la latencia HTTP por cada línea corta. El separador "…" marca una
+    # pausa audible donde antes había corte de línea. Acumulamos las partes en
+    # listas y unimos una vez al final: O(N) en vez de re-concatenar el string
+    # creciente en cada línea.
+    runs: List[Tuple[str, List[str]]] = []
     for role, text in pairs:
-        if merged and merged[-1][0] == role:
-            merged[-1] = (role, merged[-1][1] + " " + text)
+        if runs and runs[-1][0] == role:
+            runs[-1][1].append(text)
         else:
-            merged.append((role, text))
-    return merged
+            runs.append((role, [text]))
+    return [(role, " … ".join(parts)) for role, parts in runs]
 
 # ---------------------------------------------------------------------
 # ffprobe / ffmpeg helpers
@@ -217,8 +283,18 @@ def _parse_transcript_from_text(transcript_text: str, presenter: str, guest: str
 
 def _ffprobe_duration(path: Path) -> float:
     """
-    Devuelve la duración en segundos de un archivo de audio usando ffprobe.
+    Devuelve la duración en segundos de un archivo de audio.
+    Para WAV lee el header RIFF en proceso (módulo wave, microsegundos);
+    para otros formatos recurre a ffprobe (un fork por archivo).
     """
+    if path.suffix.lower() == ".wav":
+        try:
+            with wave.open(path.as_posix(), "rb") as w:
+                rate = w.getframerate()
+                if rate > 0:
+                    return w.getnframes() / rate
+        except Exception:
+            pass  # header raro: probamos con ffprobe
     if _which("ffprobe") is None:
         # fallback: si no hay ffprobe, intentamos con sox; si no, None
         return 0.0
@@ -232,27 +308,72 @@ def _ffprobe_duration(path: Path) -> float:
     except Exception:
         return 0.0
 
-def _concat_wav_ffmpeg(chunk_paths: List[Path], out_wav: Path, sample_rate: int):
+def _make_silence_wav(outdir: Path, gap_ms: int, sample_rate: int) -> Path:
+    """
+    Genera UNA vez el WAV de silencio entre bloques; el concat demuxer lo
+    referencia N veces sin coste adicional (los bytes quedan en page cache).
+    """
+    if _which("ffmpeg") is None:
+        raise SystemExit("❌ No se encuentra ffmpeg en PATH.")
+    silence = outdir / f"silence_{gap_ms}.wav"
+    if not silence.exists():
+        subprocess.run([
+            "ffmpeg", "-y", "-nostdin", "-hide_banner", "-loglevel", "error",
+            "-f", "lavfi", "-i", f"anullsrc=r={sample_rate}:cl=mono",
+            "-t", f"{gap_ms / 1000:.3f}", "-c:a", "pcm_s16le",
+            silence.as_posix()
+        ], check=True)
+    return silence
+
+def _wav_params(path: Path) -> Optional[Tuple[int, int, int]]:
+    """(framerate, canales, bytes/muestra) de un WAV, o None si no se puede leer."""
+    try:
+        with wave.open(path.as_posix(), "rb") as w:
+            return (w.getframerate(), w.getnchannels(), w.getsampwidth())
+    except Exception:
+        return None
+
+def _concat_wav_ffmpeg(chunk_paths: List[Path], out_wav: Path, sample_rate: int, gap_path: Optional[Path] = None):
     """
-    Concatena archivos de audio con ffmpeg 'concat demuxer', re-encodeando a WAV PCM 16-bit mono con sample_rate fijo.
+    Concatena archivos de audio con ffmpeg 'concat demuxer'. Si todos los
+    chunks ya son WAV PCM 16-bit mono al sample_rate objetivo, usa '-c copy'
+    (sin decode+encode, solo I/O); si no, re-encodea a WAV PCM.
+    El manifest usa nombres relativos y ffmpeg corre con cwd en el dir de
+    chunks: sin resolve() (un stat por chunk) y sin rutas que escapar.
+    Con gap_path, intercala ese silencio pregenerado entre bloques.
     """
     if _which("ffmpeg") is None:
         raise SystemExit("❌ No se encuentra ffmpeg en PATH.")
     _ensure_parent(out_wav)
-    lst = out_wav.parent / "concat.txt"
-    lst.write_text(
-        "\n".join(f"file '{p.resolve().as_posix()}'" for p in chunk_paths) + "\n",
-        encoding="utf-8"
-    )
+    workdir = chunk_paths[0].parent
+    entries: List[str] = []
+    for p in chunk_paths:
+        if entries and gap_path is not None:
+            entries.append(f"file '{gap_path.name}'")
+        entries.append(f"file '{p.name}'")
+    manifest = "\n".join(entries) + "\n"
+    # Copy-concat cuando los chunks ya vienen en el formato final (headers
+    # leídos en proceso; comprobar N chunks cuesta microsegundos).
+    target = (sample_rate, 1, 2)
+    to_check = list(chunk_paths) + ([gap_path] if gap_path is not None else [])
+    copy_ok = all(p.suffix.lower() == ".wav" and _wav_params(p) == target for p in to_check)
+    codec_args = ["-c", "copy"] if copy_ok else ["-ar", str(sample_rate), "-ac", "1", "-c:a", "pcm_s16le"]
+
+    # ffmpeg escribe a un .part y renombramos al final: nadie (make, el vídeo,
+    # un reproductor) puede ver nunca un WAV a medio escribir.
+    # El manifest entra por stdin (pipe:0): ni archivo temporal ni unlink.
+    tmp_out = out_wav.with_suffix(".wav.part")
     cmd = [
-        "ffmpeg", "-y",
-        "-f", "concat", "-safe", "0", "-i", lst.as_posix(),
-        "-ar", str(sample_rate), "-ac", "1",
-        "-c:a", "pcm_s16le",
-        out_wav.as_posix()
+        "ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+        "-f", "concat", "-safe", "0",
+        "-protocol_whitelist", "pipe,file,fd",
+        "-i", "pipe:0",
+        *codec_args,
+        "-f", "wav",
+        os.fspath(tmp_out.absolute())
     ]
-    subprocess.run(cmd, check=True)
-    lst.unlink(missing_ok=True)
+    subprocess.run(cmd, check=True, cwd=os.fspath(workdir), input=manifest.encode("utf-8"))
+    os.replace(tmp_out, out_wav)
 
 # ---------------------------------------------------------------------
 # Timeline builder
@@ -271,13 +392,14 @@ def _write_segments_sidecar(pairs: List[Tuple[str, str]], chunk_paths: List[Path
             "file": p.name
         })
     _ensure_parent(sidecar_path)
-    sidecar_path.write_text(json.dumps(records, ensure_ascii=False, indent=2), encoding="utf-8")
+    sidecar_path.write_bytes(_json_dumps_bytes(records))
     return records
 
-def _write_timeline_from_chunks(pairs: List[Tuple[str, str]], chunk_paths: List[Path], out_wav: Path) -> Path:
+def _write_timeline_from_chunks(pairs: List[Tuple[str, str]], chunk_paths: List[Path], out_wav: Path, gap_s: float = 0.0) -> Path:
     """
     A partir de los chunks generados, mide la duración real de cada uno, acumula start/end
     y guarda outputs/<slug>/<basename>.timeline.json
+    'gap_s' es el silencio intercalado entre bloques en el WAV final.
     """
     slug, basename = _slug_and_basename_from_out(out_wav)
     outdir = out_wav.parent
@@ -292,6 +414,8 @@ def _write_timeline_from_chunks(pairs: List[Tuple[str, str]], chunk_paths: List[
     t = 0.0
     for rec, p in zip(records, chunk_paths):
         dur = _ffprobe_duration(p)
+        if segments:
+            t += gap_s  # silencio intercalado antes de este bloque
         start = t
         end = t + dur
         t = end
@@ -309,7 +433,7 @@ def _write_timeline_from_chunks(pairs: List[Tuple[str, str]], chunk_paths: List[
         "segments": segments
     }
     _ensure_parent(timeline_path)
-    timeline_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+    timeline_path.write_bytes(_json_dumps_bytes(payload))
     print(f"🧭 Timeline escrito: {timeline_path}")
     return timeline_path
 
@@ -317,50 +441,100 @@ def _write_timeline_from_chunks(pairs: List[Tuple[str, str]], chunk_paths: List[
 # Síntesis TTS
 # ---------------------------------------------------------------------
 
-def _tts_to_file(client, model: str, voice: str, text: str, out_path: Path, fmt: str = "wav", sample_rate: int = 24000):
+_TTS_CACHE_DIR = Path.home() / ".cache" / "podcast_tts"
+
+def _cache_path(model: str, voice: str, fmt: str, sample_rate: int, text: str) -> Path:
+    """
+    Ruta de caché content-addressed: mismo (modelo, voz, formato, sample rate, texto)
+    => mismo audio, así que podemos reutilizarlo entre ejecuciones.
+    """
+    key = f"{model}|{voice}|{fmt}|{sample_rate}|{text}"
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+    return _TTS_CACHE_DIR / f"{digest}.{fmt}"
+
+_TTS_MAX_ATTEMPTS = 5
+
+def _tts_to_file(client, model: str, voice: str, text: str, out_path: Path, fmt: str = "wav", sample_rate: int = 24000, use_cache: bool = True):
     """
     Intenta usar streaming a fichero; si no está disponible, usa método estándar.
+    Con use_cache=True, reutiliza audio ya sintetizado para el mismo
+    (modelo, voz, formato, sample_rate, texto) y guarda cada síntesis nueva.
+    Reintenta errores transitorios (5xx, rate limit, cortes de red) con
+    backoff exponencial + jitter antes de rendirse.
     """
     _ensure_parent(out_path)
-    # Intento: streaming
-    try:
-        with client.audio.speech.with_streaming_response.create(
-            model=model, voice=voice, input=text, response_format=fmt
-        ) as resp:
-            resp.stream_to_file(out_path.as_posix())
+    cached = _cache_path(model, voice, fmt, sample_rate, text) if use_cache else None
+    if cached is not None and cached.exists() and cached.stat().st_size > 0:
+        shutil.copyfile(cached, out_path)
+        return
+
+    last_err: Optional[Exception] = None
+    for intento in range(1, _TTS_MAX_ATTEMPTS + 1):
+        # Intento: streaming (acumulamos en memoria y escribimos de una vez:
+        # chunks de 1 MB reducen syscalls frente al chunk size por defecto)
+        try:
+            with client.audio.speech.with_streaming_response.create(
+                model=model, voice=voice, input=text, response_format=fmt
+            ) as resp:
+                buf = bytearray()
+                for chunk in resp.iter_bytes(chunk_size=1 << 20):
+                    buf += chunk
+                out_path.write_bytes(bytes(buf))
+                _store_in_cache(out_path, cached)
+                return
+        except Exception:
+            pass
+        # Fallback no-streaming
+        try:
+            result = client.audio.speech.create(
+                model=model, voice=voice, input=text, response_format=fmt
+            )
+            audio_bytes = None
+            if hasattr(result, "read"):
+                audio_bytes = result.read()
+            if audio_bytes is None:
+                audio_bytes = getattr(result, "content", None)
+            if audio_bytes is None:
+                audio_bytes = getattr(result, "audio", None)
+            if audio_bytes is None:
+                raise RuntimeError("Respuesta TTS sin audio.")
+            out_path.write_bytes(audio_bytes)
+            _store_in_cache(out_path, cached)
             return
-    except Exception:
-        pass
-    # Fallback no-streaming
+        except Exception as e:
+            last_err = e
+        if intento < _TTS_MAX_ATTEMPTS:
+            espera = min(10.0, 2 ** (intento - 1)) * (0.5 + random.random())
+            print(f"⚠️ TTS ({voice}) falló (intento {intento}/{_TTS_MAX_ATTEMPTS}), reintentando en {espera:.1f}s…", file=sys.stderr)
+            time.sleep(espera)
+    raise RuntimeError(f"Fallo TTS ({voice}): {last_err}")
+
+def _store_in_cache(out_path: Path, cached: Optional[Path]) -> None:
+    """Guarda una síntesis recién generada en la caché (best-effort)."""
+    if cached is None:
+        return
     try:
-        result = client.audio.speech.create(
-            model=model, voice=voice, input=text, response_format=fmt
-        )
-        audio_bytes = None
-        if hasattr(result, "read"):
-            audio_bytes = result.read()
-        if audio_bytes is None:
-            audio_bytes = getattr(result, "content", None)
-        if audio_bytes is None:
-            audio_bytes = getattr(result, "audio", None)
-        if audio_bytes is None:
-            raise RuntimeError("Respuesta TTS sin audio.")
-        out_path.write_bytes(audio_bytes)
-    except Exception as e:
-        raise RuntimeError(f"Fallo TTS ({voice}): {e}")
+        _ensure_parent(cached)
+        shutil.copyfile(out_path, cached)
+    except Exception:
+        pass  # la caché nunca debe romper la generación
 
 # ---------------------------------------------------------------------
 # API pública (compat con podcast.py)
 # ---------------------------------------------------------------------
 
-def texto_a_audio(transcript_text: str, api_key: str, out_path: str) -> str:
+def texto_a_audio(transcript_text: Union[str, Iterable[str]], api_key: str, out_path: str, use_cache: bool = True, cfg: Optional[dict] = None) -> str:
     """
-    Genera audio WAV con voces diferenciadas a partir de un transcript en texto.
+    Genera audio WAV con voces diferenciadas a partir de un transcript en texto
+    (string completo o iterable de líneas, p. ej. un fichero abierto).
     Retorna la ruta al WAV final (out_path). Además, escribe:
       - <basename>_segments.json
       - <basename>.timeline.json
+    Con use_cache=True reutiliza síntesis previas de la caché en ~/.cache/podcast_tts.
+    Acepta la config ya cargada en 'cfg' para no releer config.json.
     """
-    cfg = _read_config(Path("config.json"))
+    if cfg is None:
+        cfg = _read_config(Path("config.json"))
     presenter = cfg.get("presentador", "Héctor")
     guest     = cfg.get("entrevistado", "Aura")
 
@@ -371,8 +545,10 @@ def texto_a_audio(transcript_text: str, api_key: str, out_path: str) -> str:
     voice_aura   = cfg.get("tts_voice_aura", "sage")
     fmt          = cfg.get("tts_format", "wav")
     sample_rate  = int(cfg.get("tts_sample_rate", 24000))
-    # Formato de los CHUNKS (lo que devuelve el TTS). Recomendamos 'mp3' por compatibilidad.
-    fmt_chunk    = cfg.get("tts_chunk_format", cfg.get("tts_format", "mp3")) or "mp3"
+    gap_ms       = max(0, int(cfg.get("tts_gap_ms", 0)))
+    # Formato de los CHUNKS (lo que devuelve el TTS). 'wav' evita un decode MP3
+    # por chunk: el siguiente paso re-encodea a WAV PCM de todas formas.
+    fmt_chunk    = cfg.get("tts_chunk_format", cfg.get("tts_format", "wav")) or "wav"
 
     allow_emojis = bool(cfg.get("tts_allow_emojis", False))
     emoji_wh     = cfg.get("tts_whitelist_emojis", ["😂","😍","😲","😏","😉","🙏","🔥"])
@@ -385,13 +561,18 @@ def texto_a_audio(transcript_text: str, api_key: str, out_path: str) -> str:
 
     print("🔊 Convirtiendo texto a audio (voces diferenciadas)...\n")
     out_wav = Path(out_path).with_suffix(".wav")
-    chunks_dir = out_wav.parent / "chunks_tts"
-    if chunks_dir.exists():
-        shutil.rmtree(chunks_dir)
-    chunks_dir.mkdir(parents=True, exist_ok=True)
+    # Chunks intermedios en un TemporaryDirectory: nombre único por ejecución
+    # (sin rmtree previo ni carpetas huérfanas) y limpieza garantizada incluso
+    # si la generación falla a medias. En RAM (/dev/shm) cuando existe: solo el
+    # WAV final debe tocar disco.
+    tmp_chunks = tempfile.TemporaryDirectory(
+        prefix="podcast_chunks_",
+        dir="/dev/shm" if os.path.isdir("/dev/shm") else None
+    )
+    chunks_dir = Path(tmp_chunks.name)
 
-    # Genera un archivo de audio por bloque
-    chunk_paths: List[Path] = []
+    # Prepara los trabajos de síntesis (limpieza de texto fuera del pool)
+    jobs: List[Tuple[str, str, str, Path]] = []  # (role, voice, tts_text, out_chunk)
     for i, (role, raw_text) in enumerate(pairs, start=1):
         if not raw_text.strip():
             continue
@@ -409,10 +590,34 @@ def texto_a_audio(transcript_text: str, api_key: str, out_path: str) -> str:
             print(f"  • {role:<8} → texto filtrado vacío, se omite.")
             continue
 
-        out_chunk = chunks_dir / f"{i:03d}_{role.lower()}.{fmt_chunk}"
+        # Nombre por hash de contenido: dos bloques idénticos (mismo role/voz/
+        # texto) comparten archivo y solo se sintetizan una vez por ejecución.
+        digest = hashlib.sha256(f"{role}|{voice}|{model}|{tts_text}".encode("utf-8")).hexdigest()[:16]
+        out_chunk = chunks_dir / f"{digest}.{fmt_chunk}"
         print(f"  • {role:<8} → {voice:<8}  [{len(tts_text)} chars]")
-        _tts_to_file(client, model=model, voice=voice, text=tts_text, out_path=out_chunk, fmt=fmt_chunk, sample_rate=sample_rate)
-        chunk_paths.append(out_chunk)
+        jobs.append((role, voice, tts_text, out_chunk))
+
+    # Síntesis en paralelo: cada llamada TTS es una petición de red (I/O-bound),
+    # así que solapamos N peticiones y conservamos el orden original de los chunks.
+    tts_workers = max(1, int(cfg.get("tts_concurrency", 8)))
+    chunk_paths: List[Path] = []
+    submitted: set = set()
+    with ThreadPoolExecutor(max_workers=tts_workers) as ex:
+        futures = []
+        for (role, voice, tts_text, out_chunk) in jobs:
+            if out_chunk in submitted:
+                futures.append((out_chunk, None))  # bloque repetido: reutiliza el archivo
+                continue
+            submitted.add(out_chunk)
+            futures.append((out_chunk, ex.submit(
+                _tts_to_file, client, model=model, voice=voice, text=tts_text,
+                out_path=out_chunk, fmt=fmt_chunk, sample_rate=sample_rate,
+                use_cache=use_cache
+            )))
+        for out_chunk, fut in futures:
+            if fut is not None:
+                fut.result()  # propaga errores de síntesis en orden
+            chunk_paths.append(out_chunk)
 
     # Debug: listar chunks generados
     try:
@@ -428,24 +633,29 @@ def texto_a_audio(transcript_text: str, api_key: str, out_path: str) -> str:
 
     # Concatenación a WAV final
     if len(chunk_paths) == 1:
-        print("⚠️ Solo un bloque de audio generado, copiando directamente al archivo final.")
-        shutil.copy(chunk_paths[0], out_wav)
+        print("⚠️ Solo un bloque de audio generado, enlazando directamente al archivo final.")
+        out_wav.unlink(missing_ok=True)
+        try:
+            os.link(chunk_paths[0], out_wav)  # zero-copy: mismo inodo, sin mover bytes
+        except OSError:
+            shutil.copyfile(chunk_paths[0], out_wav)
     else:
         print(f"🔗 Concatenando {len(chunk_paths)} bloques de audio con ffmpeg...")
-        _concat_wav_ffmpeg(chunk_paths, out_wav, sample_rate)
+        gap_path = _make_silence_wav(chunks_dir, gap_ms, sample_rate) if gap_ms > 0 else None
+        _concat_wav_ffmpeg(chunk_paths, out_wav, sample_rate, gap_path=gap_path)
 
     # Verificar que el archivo final existe y no está vacío
     if not out_wav.exists() or out_wav.stat().st_size == 0:
         raise RuntimeError(f"❌ El archivo de salida no se generó correctamente: {out_wav}")
 
     # Timeline real a partir de duraciones de chunks
-    _write_timeline_from_chunks(pairs, chunk_paths, out_wav)
+    gap_s = gap_ms / 1000.0 if len(chunk_paths) > 1 else 0.0
+    _write_timeline_from_chunks(pairs, chunk_paths, out_wav, gap_s=gap_s)
 
     # Limpieza: eliminar carpeta temporal de chunks una vez generado todo
     try:
-        if chunks_dir.exists():
-            shutil.rmtree(chunks_dir)
-            print(f"🧹 Carpeta temporal eliminada: {chunks_dir}")
+        tmp_chunks.cleanup()
+        print(f"🧹 Carpeta temporal eliminada: {chunks_dir}")
     except Exception as e:
         print(f"⚠️ No se pudo borrar {chunks_dir}: {e}", file=sys.stderr)
 
@@ -486,6 +696,7 @@ if __name__ == "__main__":
     parser.add_argument("--config", default="config.json", help="Archivo de configuración JSON (default: config.json)")
     parser.add_argument("--txt", help="Archivo de texto con el guion (sobrescribe tema-from-config)")
     parser.add_argument("--out", help="Archivo de salida WAV (sobrescribe tema-from-config)")
+    parser.add_argument("--no-cache", action="store_true", help="No reutilizar ni alimentar la caché TTS en ~/.cache/podcast_tts")
 
     args = parser.parse_args()
 
@@ -524,15 +735,15 @@ if __name__ == "__main__":
         print("❌ Ruta de salida para audio no especificada.", file=sys.stderr)
         sys.exit(1)
 
-    transcript_text = txt_path.read_text(encoding="utf-8")
-
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         print("❌ No se encontró OPENAI_API_KEY en variables de entorno.", file=sys.stderr)
         sys.exit(1)
 
     try:
-        wav_path = texto_a_audio(transcript_text, api_key, str(out_path))
+        # El guion se consume línea a línea: sin cargar todo el fichero antes.
+        with txt_path.open(encoding="utf-8") as f:
+            wav_path = texto_a_audio(f, api_key, str(out_path), use_cache=not args.no_cache, cfg=cfg)
     except Exception as e:
         print(f"❌ Error al generar audio: {e}", file=sys.stderr)
         sys.exit(1)
@@ -27,15 +27,45 @@ except Exception:  # pragma: no cover
     import openai  # type: ignore
     OpenAI = openai.OpenAI
 
+import functools
 import json
 import os
 import random
 import re
+import unicodedata
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from typing import List, Tuple
 from datetime import datetime
 
+import sys
+
 from colorama import Fore, Style, init as colorama_init
-colorama_init(autoreset=True)
+if sys.stdout.isatty():
+    colorama_init(autoreset=True)
+else:
+    # Sin TTY (batch, pipe, CI) no hay códigos ANSI que traducir: se evita el
+    # proxy de colorama sobre stdout (coste por write) y se anulan los estilos.
+    class _SinEstilo:
+        def __getattr__(self, _nombre: str) -> str:
+            return ""
+    Fore = Style = _SinEstilo()  # type: ignore[assignment]
+
+# orjson si está instalado (serializa/parsea en C, 2–10x más rápido);
+# si no, se cae al json de la stdlib sin cambiar el formato en disco.
+try:
+    import orjson  # type: ignore
+except Exception:  # pragma: no cover
+    orjson = None
+
+def _json_loads(data: bytes):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+def _json_dumps_bytes(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
 
 # ---------------------------------------------------------------------
 # Configuración base y utilidades
@@ -61,6 +91,7 @@ DEFAULT_CONFIG = {
     "temperatura": 0.85,
     "semilla": None,
     "max_turnos": 70,                       # nº de intervenciones del invitado aprox.
+    "contexto_turnos": 12,                  # renglones de transcripción enviados al LLM por turno
     "incluir_cold_open": True,
     "incluir_cierre_llamado": True,
     "humor_nivel": "bajo",                  # bajo|medio|medio-alto|alto
@@ -117,12 +148,52 @@ MULETILLAS_GENERICAS = [
     "me gustaría decir que", "la verdad es que",
 ]
 
+# ---------------------------------------------------------------------
+# Regex precompiladas (las limpiezas corren una vez por línea generada;
+# compilar aquí evita el lookup en la caché de `re` en cada llamada)
+# ---------------------------------------------------------------------
+_RE_PAREN_LONG   = re.compile(r"\s*\((?:[^)]{0,80})\)")
+_RE_ARRANQUE     = re.compile(r"^(oye|mira|bueno|pues|a ver)\s*,\s*", re.IGNORECASE)
+_RE_PREG_ESPACIO = re.compile(r"^¿\s+")
+_RE_PREG_PREAMB  = re.compile(r"^¿\s*(podrías|puedes|serías capaz de|te parece si)\s+", re.IGNORECASE)
+_RE_PREG_DOBLE   = re.compile(r"^¿¿")
+_RE_FIN_COLD     = re.compile(r"[ ?]+$")
+_RE_FIN_PREG     = re.compile(r"[\s\.]*$")
+_RE_INTERJ       = re.compile(r"\b(eh|mmm|vale|ojo)\b(?=[,\.!\?]|\s|$)", re.IGNORECASE)
+_RE_WORD         = re.compile(r"\w+")
+_RE_TAG          = re.compile(r"\[[^\]]+\]")
+_RE_NUM_PREFIX   = re.compile(r"^\d+[\).\s]+")
+# Una sola alternación en vez de 11 pasadas (una por término del banlist)
+_RE_ROBOTISMOS   = re.compile("|".join(re.escape(b) for b in ROBOTISMO_BANLIST), re.IGNORECASE)
+# Ídem para las muletillas genéricas de arranque: un patrón anclado al inicio
+_RE_MULETILLAS_START = re.compile(
+    r"^(?:" + "|".join(re.escape(m) for m in MULETILLAS_GENERICAS) + r")[, ]+\s*",
+    re.IGNORECASE,
+)
+
+@functools.lru_cache(maxsize=4)
+def _re_vocativo(otro: str):
+    """Patrones de vocativo del interlocutor: solo hay dos oradores posibles,
+    así que se compilan una vez por orador y se reutilizan en cada línea."""
+    return (
+        re.compile(rf"^({re.escape(otro)})\s*,\s*"),
+        re.compile(rf"\b({re.escape(otro)})\s*,"),
+    )
+
+# Whitelist del slug: todo lo que no sea [a-z0-9 -] tras el paso a ASCII se descarta
+_SLUG_TRANS = str.maketrans(
+    {chr(o): None for o in range(128) if chr(o) not in "abcdefghijklmnopqrstuvwxyz0123456789 -"}
+)
+_RE_DASHES = re.compile(r"-+")
+
+@functools.lru_cache(maxsize=32)
 def slugify(texto: str) -> str:
-    t = texto.lower()
-    t = re.sub(r"[^a-z0-9áéíóúüñ\s-]", "", t)
-    t = re.sub(r"\s+", "-", t)
-    t = re.sub(r"-+", "-", t).strip("-")
-    return t
+    # NFKD + encode ascii: 'física cuántica' -> 'fisica cuantica', que es
+    # como están nombrados los ficheros de temas/ (antes los acentos se
+    # conservaban y el slug no casaba con el JSON del tema).
+    t = unicodedata.normalize("NFKD", texto.lower()).encode("ascii", "ignore").decode("ascii")
+    t = t.translate(_SLUG_TRANS).replace(" ", "-")
+    return _RE_DASHES.sub("-", t).strip("-")
 
 def _ruta_tema(tema: str) -> str:
     base_dir = os.path.join(os.path.dirname(__file__), "temas")
@@ -130,33 +201,39 @@ def _ruta_tema(tema: str) -> str:
 
 def _cargar_config_tema(tema: str) -> dict:
     ruta = _ruta_tema(tema)
+    # EAFP: abrir directamente ahorra el stat() previo de os.path.exists
+    # (dos syscalls -> una; en arranques fríos las syscalls dominan).
     try:
-        if os.path.exists(ruta):
-            print(f"{Fore.CYAN}[TEMA]{Style.RESET_ALL} Cargado tema desde: {ruta}")
-            with open(ruta, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                return data if isinstance(data, dict) else {}
+        # Lectura en bytes de una tacada: json.loads acepta bytes y se
+        # ahorra el decodificado intermedio del modo texto.
+        data = _json_loads(Path(ruta).read_bytes())
+    except FileNotFoundError:
+        return {}
     except Exception as e:
         print(f"{Fore.YELLOW}Aviso: no se pudo cargar el tema '{tema}': {e}{Style.RESET_ALL}")
-    return {}
+        return {}
+    print(f"{Fore.CYAN}[TEMA]{Style.RESET_ALL} Cargado tema desde: {ruta}")
+    return data if isinstance(data, dict) else {}
 
+@functools.lru_cache(maxsize=1)
 def cargar_configuracion() -> dict:
     """
     Carga DEFAULT_CONFIG + config.json + temas/<slug>.json.
     El tema sobrescribe claves de DEFAULT_CONFIG si están presentes.
+    Cacheada: los ficheros se leen y parsean una sola vez por proceso.
     """
     cfg = DEFAULT_CONFIG.copy()
 
-    # 1) config.json
-    if os.path.exists(CONFIG_PATH):
-        try:
-            with open(CONFIG_PATH, "r", encoding="utf-8") as f:
-                incoming = json.load(f)
-                if isinstance(incoming, dict):
-                    cfg.update(incoming)
-        except Exception as e:
-            print(f"{Fore.YELLOW}Aviso: no se pudo cargar config.json ({e}). "
-                  f"Se usan valores por defecto.{Style.RESET_ALL}")
+    # 1) config.json (EAFP: sin stat() previo; su ausencia es silenciosa como antes)
+    try:
+        incoming = _json_loads(Path(CONFIG_PATH).read_bytes())
+        if isinstance(incoming, dict):
+            cfg.update(incoming)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"{Fore.YELLOW}Aviso: no se pudo cargar config.json ({e}). "
+              f"Se usan valores por defecto.{Style.RESET_ALL}")
 
     # 2) temas/<slug>.json (sobrescribe)
     tema_sel = cfg.get("tema", DEFAULT_CONFIG["tema"])
@@ -222,6 +299,7 @@ modelo              = config["modelo"]
 temperatura         = float(config["temperatura"])
 semilla             = config["semilla"]
 max_turnos          = int(config["max_turnos"])
+contexto_turnos     = int(config.get("contexto_turnos", 12))
 incluir_cold_open   = bool(config["incluir_cold_open"])
 incluir_cierre_llamado = bool(config["incluir_cierre_llamado"])
 humor_nivel         = config.get("humor_nivel", "bajo")
@@ -242,8 +320,14 @@ if not isinstance(formato_salida_lines, list):
 if semilla is not None:
     random.seed(semilla)
 
+# Diagnóstico solo fuera de prod: con el flag apagado los print de depuración
+# ni siquiera construyen sus f-strings (la guarda va en el punto de llamada).
+_DEBUG = modo != "prod"
+
 # Debug: muestra la config efectiva (clave -> valor resumido)
 def _dbg_resumen_config():
+    if not _DEBUG:
+        return
     resumen = {
         "tema": tema,
         "tema_visible": tema,
@@ -275,39 +359,55 @@ def _dbg_resumen_config():
 # Limpiezas / estilo
 # ---------------------------------------------------------------------
 
+def _collapse_ws(s: str) -> str:
+    """Normaliza espacios repetidos por línea. Para las cadenas cortas de una
+    intervención, split+join a nivel C gana al motor regex; se preservan los
+    saltos de línea porque enriquecer_dialogo decora línea a línea."""
+    if "\n" in s:
+        return "\n".join(" ".join(l.split()) for l in s.splitlines())
+    return " ".join(s.split())
+
 def _limpia_robotismos(texto: str) -> str:
-    t = texto.strip()
-    for ban in ROBOTISMO_BANLIST:
-        if ban.lower() in t.lower():
-            t = re.sub(re.escape(ban), "", t, flags=re.IGNORECASE)
-    t = re.sub(r"\s{2,}", " ", t).strip(" ,")
+    t = _RE_ROBOTISMOS.sub("", texto.strip())
+    t = _collapse_ws(t).strip(" ,")
     # reduce paréntesis largos
-    t = re.sub(r"\s*\((?:[^)]{0,80})\)", lambda m: "" if len(m.group(0)) > 40 else m.group(0), t)
+    t = _RE_PAREN_LONG.sub(lambda m: "" if len(m.group(0)) > 40 else m.group(0), t)
     return t
 
+# Solo hay dos oradores: la contraparte es una búsqueda en dict, no un if por llamada
+_CONTRAPARTE = {presentador: entrevistado, entrevistado: presentador}
+
 def _contraparte(orador: str) -> str:
-    return presentador if orador == entrevistado else entrevistado
+    return _CONTRAPARTE.get(orador, entrevistado)
 
 def _limpia_muletillas(texto: str, orador: str) -> str:
     t = texto.strip()
     t = MULETILLAS_INICIO.sub("", t)
     otro = _contraparte(orador)
-    t = re.sub(rf"^({re.escape(otro)})\s*,\s*", "", t)
-    t = re.sub(rf"\b({re.escape(otro)})\s*,", "", t)
-    for m in MULETILLAS_GENERICAS:
-        t = re.sub(rf"^(?:{re.escape(m)})[, ]+\s*", "", t, flags=re.IGNORECASE)
-    arranque = re.compile(r"^(oye|mira|bueno|pues|a ver)\s*,\s*", re.IGNORECASE)
+    re_voc_inicio, re_voc_medio = _re_vocativo(otro)
+    t = re_voc_inicio.sub("", t)
+    t = re_voc_medio.sub("", t)
+    # Un solo escaneo en C (repetido solo si hay muletillas encadenadas)
+    t, n = _RE_MULETILLAS_START.subn("", t)
+    while n:
+        t, n = _RE_MULETILLAS_START.subn("", t)
     if not any(t.lower().startswith(m.lower()) for m in muletillas_permitidas):
-        t = arranque.sub("", t)
-    t = re.sub(r"\s{2,}", " ", t).strip(" ,")
+        t = _RE_ARRANQUE.sub("", t)
+    t = _collapse_ws(t).strip(" ,")
     return t
 
 def _recorta_preambulos_en_preguntas(t: str) -> str:
-    t = re.sub(r"^¿\s+", "¿", t)
-    t = re.sub(r"^¿\s*(podrías|puedes|serías capaz de|te parece si)\s+", "¿", t, flags=re.IGNORECASE)
-    t = re.sub(r"^¿¿", "¿", t)
+    t = _RE_PREG_ESPACIO.sub("¿", t)
+    t = _RE_PREG_PREAMB.sub("¿", t)
+    t = _RE_PREG_DOBLE.sub("¿", t)
     return t
 
+def _asegura_interrogacion(t: str) -> str:
+    # Normaliza el cierre en una sola sustitución en vez de rstrip + concat
+    if t.rstrip().endswith("?"):
+        return t
+    return _RE_FIN_PREG.sub("?", t, count=1)
+
 def _quita_prefijo_orador(texto: str, orador: str) -> str:
     pref = f"{orador}:"
     t = texto.strip()
@@ -318,12 +418,14 @@ def _quita_prefijo_orador(texto: str, orador: str) -> str:
 # ---------------------------------------------------------------------
 # Helpers para slug/basename de outputs
 # ---------------------------------------------------------------------
+@functools.lru_cache(maxsize=1)
 def _get_output_slug() -> str:
     """Slug definitivo para carpeta de outputs: usa 'output_slug' si está, si no slugify(tema)."""
     if isinstance(output_slug, str) and output_slug.strip():
         return output_slug.strip()
     return slugify(tema)
 
+@functools.lru_cache(maxsize=1)
 def _get_output_basename(slug: str) -> str:
     """Nombre base de archivo en outputs: usa 'output_basename' si está, si no 'podcast_<slug>'."""
     if isinstance(output_basename, str) and output_basename.strip():
@@ -333,24 +435,28 @@ def _get_output_basename(slug: str) -> str:
 # ---------------------------------------------------------------------
 # Corrección de vocativos mal dirigidos (nuevo helper)
 # ---------------------------------------------------------------------
+@functools.lru_cache(maxsize=4)
+def _addr_patterns(yo: str, tu: str) -> Tuple[Tuple[re.Pattern, str], ...]:
+    """Tabla de (patrón compilado, reemplazo) por orador. Solo hay dos
+    oradores posibles, pero _fix_addressing corre en cada turno: compilar
+    aquí evita rehacer los tres patrones con re.escape en cada llamada."""
+    return (
+        # Reemplazos de vocativo: "Héctor," / "Héctor:" / "Héctor?" / "Héctor!" / "Héctor …"
+        (re.compile(rf"\b{re.escape(yo)}\s*([,，:;])"), tu + r"\1"),
+        (re.compile(rf"([¿¡])\s*{re.escape(yo)}\s*([,，:;?!])"), r"\1" + tu + r"\2"),
+        # Caso al inicio de frase sin puntuación inmediata pero con espacio y minúscula/luego palabra
+        (re.compile(rf"^({re.escape(yo)})\s+(?=[a-záéíóúüñ])"), tu + ", "),
+    )
+
 def _fix_addressing(texto: str, orador: str) -> str:
     """
     Si el orador se dirige por nombre y usa su propio nombre (vocativo),
     corrige para que mencione al interlocutor (p. ej., 'Héctor,' dicho por Héctor -> 'Aura,').
     Solo tocamos usos vocativos (seguido de coma/pausa/puntuación), para no romper menciones narrativas.
     """
-    yo = orador
-    tu = _contraparte(orador)
-    # Reemplazos de vocativo: "Héctor," / "Héctor:" / "Héctor?" / "Héctor!" / "Héctor …"
-    patrones = [
-        (rf"\b{re.escape(yo)}\s*([,，:;])", tu + r"\1"),
-        (rf"([¿¡])\s*{re.escape(yo)}\s*([,，:;?!])", r"\1" + tu + r"\2"),
-        # Caso al inicio de frase sin puntuación inmediata pero con espacio y minúscula/luego palabra
-        (rf"^({re.escape(yo)})\s+(?=[a-záéíóúüñ])", tu + ", "),
-    ]
     t = texto
-    for pat, rep in patrones:
-        t = re.sub(pat, rep, t)
+    for pat, rep in _addr_patterns(orador, _contraparte(orador)):
+        t = pat.sub(rep, t)
     return t
 
 # ---------------------------------------------------------------------
@@ -360,56 +466,58 @@ def _fix_addressing(texto: str, orador: str) -> str:
 # --- Control estricto de emojis expresivos (para TTS) ---
 ALLOWED_EMOJIS = {"😂","😍","😲","😏","😉","🙏","🔥"}  # solo caras/gestos que cambian prosodia
 
-def _is_emoji_char(ch: str) -> bool:
-    """Heurística simple: detecta la mayoría de emojis de los bloques U+1F300–U+1FAFF y símbolos misceláneos."""
-    o = ord(ch)
-    return (
-        0x1F300 <= o <= 0x1FAFF or  # Misc Symbols & Pictographs / Supplemental Symbols & Pictographs
-        0x2600 <= o <= 0x27BF or    # Misc symbols, Dingbats
-        0x1F900 <= o <= 0x1F9FF     # Supplemental Symbols and Pictographs subset
-    )
+# Mismos bloques que cubría la antigua heurística por carácter
+# (U+1F300–U+1FAFF, símbolos misceláneos/dingbats); el escaneo corre en C.
+_RE_EMOJI = re.compile("[\U0001F300-\U0001FAFF☀-➿]")
+# Pasada fusionada: frontera de frase O emoji en un mismo patrón
+_RE_SENT_O_EMOJI = re.compile("([\\.!?]\\s+|\\n+)|[\U0001F300-\U0001FAFF☀-➿]")
+
+class _CleanStr(str):
+    """Marcador de texto ya saneado (whitelist de emojis + tope por frase).
+    Cualquier operación de string posterior devuelve str normal, con lo que
+    un texto modificado pierde la marca y vuelve a limpiarse — es lo deseado."""
+    __slots__ = ()
+
+def _clean_emojis(texto: str, max_per_sentence: int = 1) -> "_CleanStr":
+    """
+    Filtro fusionado: elimina emojis fuera de ALLOWED_EMOJIS y limita a
+    'max_per_sentence' por frase, en UNA sola pasada sobre el texto
+    (antes eran dos funciones → dos barridos y dos strings intermedios).
+    """
+    if not _RE_EMOJI.search(texto):
+        return _CleanStr(texto)
+    out = []
+    last = 0
+    count = 0
+    for m in _RE_SENT_O_EMOJI.finditer(texto):
+        if m.group(1) is not None:
+            # frontera de frase: copia tal cual y resetea el contador
+            out.append(texto[last:m.end()])
+            count = 0
+        else:
+            out.append(texto[last:m.start()])
+            ch = m.group(0)
+            if ch in ALLOWED_EMOJIS and count < max_per_sentence:
+                out.append(ch)
+                count += 1
+            # si no, se descarta (decorativo o excedente)
+        last = m.end()
+    out.append(texto[last:])
+    return _CleanStr("".join(out))
 
 def _filtra_emojis(texto: str) -> str:
     """
     Elimina cualquier emoji que no esté en ALLOWED_EMOJIS.
     Mantiene texto normal y los emojis de la whitelist.
     """
-    out_chars = []
-    for ch in texto:
-        if _is_emoji_char(ch) and ch not in ALLOWED_EMOJIS:
-            # descarta emojis decorativos (🌍🌟🦖🦕, etc.)
-            continue
-        out_chars.append(ch)
-    return "".join(out_chars)
+    if not _RE_EMOJI.search(texto):
+        return texto
+    return _RE_EMOJI.sub(lambda m: m.group(0) if m.group(0) in ALLOWED_EMOJIS else "", texto)
 
 def _limit_emoji_per_sentence(texto: str, max_per_sentence: int = 1) -> str:
-    """
-    Limita a 'max_per_sentence' emojis por frase.
-    División heurística por . ! ? y nueva línea. Mantiene el primer emoji permitido y filtra el resto.
-    """
-    def _process_chunk(chunk: str) -> str:
-        count = 0
-        out = []
-        for ch in chunk:
-            if _is_emoji_char(ch):
-                if ch in ALLOWED_EMOJIS and count < max_per_sentence:
-                    out.append(ch)
-                    count += 1
-                else:
-                    # drop emoji extra o no permitido
-                    continue
-            else:
-                out.append(ch)
-        return "".join(out)
-
-    parts = re.split(r'([\.!?]\s+|\n+)', texto)  # conserva separadores
-    processed = []
-    for i, part in enumerate(parts):
-        if i % 2 == 0:
-            processed.append(_process_chunk(part))
-        else:
-            processed.append(part)  # separador
-    return "".join(processed)
+    """Compat: delega en la pasada fusionada (los emojis no permitidos ya
+    caen aquí también, que es lo que hacían juntas las dos funciones)."""
+    return _clean_emojis(texto, max_per_sentence=max_per_sentence)
 
 EMOJI_MAP = {
     r"\[riendo\]": " 😂 ",
@@ -427,37 +535,51 @@ PALABRAS_CLAVE = {
     r"\b(broma|chiste)\b": " 😉",
 }
 
+# Alternación única con grupos nombrados y despacho en el callback: una
+# pasada del motor re sustituye a las 6 (etiquetas) + 4 (claves) sub() en cadena.
+_RE_ETIQUETAS = re.compile("|".join(f"(?P<e{i}>{p})" for i, p in enumerate(EMOJI_MAP)), re.IGNORECASE)
+_ETIQUETA_EMOJI = {f"e{i}": emoji for i, emoji in enumerate(EMOJI_MAP.values())}
+_RE_CLAVES = re.compile("|".join(f"(?P<k{i}>{p})" for i, p in enumerate(PALABRAS_CLAVE)), re.IGNORECASE)
+_CLAVE_EMOJI = {f"k{i}": emoji for i, emoji in enumerate(PALABRAS_CLAVE.values())}
+
+def _sub_etiqueta(m: re.Match) -> str:
+    return m.group(0) + _ETIQUETA_EMOJI[m.lastgroup]
+
+def _sub_clave(m: re.Match) -> str:
+    return m.group(0) + _CLAVE_EMOJI[m.lastgroup]
+
+_RE_EMOJI_PERMITIDO = re.compile(r"[😂😍😲😏😉🙏🔥]")
+
 def _tiene_etiquetas_o_emojis(t: str) -> bool:
-    return bool(re.search(r"\[[^\]]+\]", t) or re.search(r"[😂😍😲😏😉🙏🔥]", t))
+    return bool(_RE_TAG.search(t) or _RE_EMOJI_PERMITIDO.search(t))
 
 def enriquecer_dialogo(texto: str) -> str:
     # 1) Si hay etiquetas, convertirlas en emojis (sin borrar el texto original)
-    for patron, emoji in EMOJI_MAP.items():
-        texto = re.sub(patron, lambda m: m.group(0) + emoji, texto, flags=re.IGNORECASE)
+    texto = _RE_ETIQUETAS.sub(_sub_etiqueta, texto)
 
     # 2) Si NO hay etiquetas ni emojis, añade por palabras clave (ligero)
     if not _tiene_etiquetas_o_emojis(texto):
         def decora_linea(l):
-            if any(e in l for e in ("😂","😍","😲","😏","😉","🙏","🔥")):
+            if _RE_EMOJI_PERMITIDO.search(l):
                 return l
-            for patron, emoji in PALABRAS_CLAVE.items():
-                if re.search(patron, l, flags=re.IGNORECASE):
-                    return re.sub(patron, lambda m: m.group(0) + emoji, l, count=1, flags=re.IGNORECASE)
-            return l
+            # count=1: decora la primera clave que aparezca en la línea
+            return _RE_CLAVES.sub(_sub_clave, l, count=1)
         texto = "\n".join(decora_linea(l) for l in texto.splitlines())
 
     # 3) Pausas naturales tras interjecciones
-    texto = re.sub(r"\b(eh|mmm|vale|ojo)\b(?=[,\.!\?]|\s|$)", r"\1…", texto, flags=re.IGNORECASE)
-    # 4) Filtro de emojis: solo whitelist y 1 por frase
-    texto = _filtra_emojis(texto)
-    texto = _limit_emoji_per_sentence(texto, max_per_sentence=1)
+    texto = _RE_INTERJ.sub(r"\1…", texto)
+    # 4) Filtro de emojis: solo whitelist y 1 por frase (una sola pasada)
+    texto = _clean_emojis(texto, max_per_sentence=1)
     return texto
 
 # ---------------------------------------------------------------------
 # Prompting
 # ---------------------------------------------------------------------
 
+@functools.lru_cache(maxsize=1)
 def _sistema_global() -> str:
+    # Todos los insumos son globales fijados al cargar config: el prompt de
+    # sistema es idéntico en las ~70 llamadas de un episodio, se construye una vez.
     formalidad = {
         "baja": "muy coloquial",
         "medio": "cercana y profesional",
@@ -516,46 +638,177 @@ def _sistema_global() -> str:
 def _longitud_objetivo() -> str:
     return LONGITUD_MAP.get(longitud_respuestas, LONGITUD_MAP["media"])
 
+# Plantilla del turno: idioma y longitud objetivo son fijos durante el run,
+# así que se interpolan una vez aquí; en caliente solo quedan dos huecos.
+_USER_INSTR_TMPL = (
+    "Transcripción hasta ahora (formato 'Nombre: texto'):\n"
+    "{transcript}\n\n"
+    "Escribe SOLO la siguiente intervención de {orador} en " + idioma + ".\n"
+    "Longitud objetivo: " + _longitud_objetivo() + ".\n"
+    "Directrices: natural, específica, con etiquetas emocionales y emojis puntuales; "
+    "sin prefijos de nombre ni comillas. No repitas texto previo."
+)
+
+@functools.lru_cache(maxsize=1)
 def _client(api_key: str) -> OpenAI:
-    return OpenAI(api_key=api_key)
+    """Cliente único por proceso con pool keep-alive: las ~30 llamadas de un
+    episodio reutilizan la conexión TLS en vez de renegociar el handshake
+    (2 RTT por socket nuevo). Mismo esquema que el cliente TTS de audio.py."""
+    try:
+        import httpx
+        http_client = httpx.Client(
+            limits=httpx.Limits(max_connections=16, max_keepalive_connections=16),
+            timeout=60.0,
+        )
+        return OpenAI(api_key=api_key, http_client=http_client)
+    except Exception:  # pragma: no cover - httpx viene con openai, pero por si acaso
+        return OpenAI(api_key=api_key)
+
+@functools.lru_cache(maxsize=1)
+def _mensaje_sistema() -> dict:
+    """Dict de sistema compartido entre llamadas: la API solo lo lee, así que
+    reutilizar el mismo objeto evita recrear dict + string multi-KB por turno."""
+    return {"role": "system", "content": _sistema_global()}
+
+@functools.lru_cache(maxsize=1)
+def _extra_cache_prompt() -> dict:
+    """extra_body compartido por todas las llamadas del episodio.
+
+    El mensaje de sistema es idéntico byte a byte durante toda la ejecución
+    (ver _mensaje_sistema), así que una prompt_cache_key estable por tema
+    ayuda al servidor a enrutar cada llamada al mismo prefijo ya cacheado:
+    menor TTFT y descuento en los tokens de entrada repetidos."""
+    return {"prompt_cache_key": f"guion-{_get_output_slug()}"}
+
+# Ajustes de muestreo por tipo de turno. Los seguimientos y la reflexión
+# final son cortos por instrucción: capar max_tokens recorta la latencia
+# (menos pasos autoregresivos en el servidor y menos bytes que transferir).
+_AJUSTES_LLAMADA = {
+    "follow": {"max_tokens": 60, "temperature": 0.7},
+    "reflexion": {"max_tokens": 120},
+}
 
-def _llm_siguiente_linea(client: OpenAI, transcript: str, orador: str) -> str:
-    instruccion = (
-        f"Transcripción hasta ahora (formato 'Nombre: texto'):\n"
-        f"{transcript}\n\n"
-        f"Escribe SOLO la siguiente intervención de {orador} en {idioma}.\n"
-        f"Longitud objetivo: {_longitud_objetivo()}.\n"
-        f"Directrices: natural, específica, con etiquetas emocionales y emojis puntuales; "
-        f"sin prefijos de nombre ni comillas. No repitas texto previo."
-    )
-    resp = client.chat.completions.create(
+def _llm_siguiente_linea(client: OpenAI, transcript: str, orador: str, kind: str = "main") -> str:
+    instruccion = _USER_INSTR_TMPL.format(transcript=transcript, orador=orador)
+    # stream=True: se consumen los tokens según llegan en vez de esperar a
+    # que el servidor bufferice la respuesta completa antes del primer byte.
+    params = dict(
         model=modelo,
         temperature=temperatura,
         top_p=0.95,
         frequency_penalty=0.25,
         presence_penalty=0.0,
+        stream=True,
+        extra_body=_extra_cache_prompt(),
         messages=[
-            {"role": "system", "content": _sistema_global()},
+            _mensaje_sistema(),
             {"role": "user", "content": instruccion}
         ]
     )
-    texto = resp.choices[0].message.content.strip()
+    params.update(_AJUSTES_LLAMADA.get(kind, ()))
+    resp = client.chat.completions.create(**params)
+    partes: List[str] = []
+    for chunk in resp:
+        if chunk.choices:
+            delta = chunk.choices[0].delta.content
+            if delta:
+                partes.append(delta)
+    texto = "".join(partes).strip()
+    return _postprocesa_turno(texto, orador)
+
+def _postprocesa_turno(texto: str, orador: str) -> str:
+    """Cadena de limpieza estándar de una intervención recién generada."""
     texto = _quita_prefijo_orador(texto, orador)
     texto = _limpia_robotismos(texto)
     texto = _limpia_muletillas(texto, orador)
     # Corregir vocativos mal dirigidos (p. ej., Héctor diciéndose a sí mismo)
     texto = _fix_addressing(texto, orador)
     # NUEVO: enriquecer si faltan etiquetas/emojis/pausas
+    # (enriquecer_dialogo ya termina con _clean_emojis: el invariante de
+    # whitelist + 1 emoji/frase queda garantizado sin otra pasada aquí)
     texto = enriquecer_dialogo(texto)
-    # Filtro final de seguridad (por si el modelo insistiera)
-    texto = _limit_emoji_per_sentence(_filtra_emojis(texto), max_per_sentence=1)
     return texto
 
+def _generar_apertura(client: OpenAI) -> Tuple[str, str]:
+    """
+    Cold open y presentación del invitado en UNA sola llamada con envoltorio
+    JSON: dos idas y vueltas de red pasan a una. Ambas piezas dependen solo
+    del tema y de la bienvenida (plantilla estática); la reflexión final no
+    entra aquí porque necesita la transcripción completa del episodio.
+    """
+    bienvenida = _mensajes_base()["bienvenida"]
+    instr = (
+        "Devuelve SOLO un objeto JSON con las claves 'cold_open' y 'presentacion_invitado'.\n"
+        f"- cold_open: 1–2 frases intrigantes y sugerentes, pero concretas, SOBRE el tema '{tema}'. "
+        "Menciona explícitamente el tema y no cambies a otros ámbitos. No presentes a nadie aún. "
+        "Evita clichés y evita cualquier referencia técnica a IA.\n"
+        f"- presentacion_invitado: primer turno de {entrevistado} justo después de esta bienvenida "
+        f"del presentador: \"{bienvenida}\". Preséntate brevemente y saluda a la audiencia, "
+        "sin prefijo de nombre ni comillas."
+    )
+    resp = client.chat.completions.create(
+        model=modelo,
+        temperature=0.9,
+        top_p=0.95,
+        frequency_penalty=0.25,
+        presence_penalty=0.0,
+        response_format={"type": "json_object"},
+        extra_body=_extra_cache_prompt(),
+        messages=[
+            _mensaje_sistema(),
+            {"role": "user", "content": instr}
+        ]
+    )
+    try:
+        data = json.loads(resp.choices[0].message.content)
+    except Exception:
+        data = {}
+    cold = str(data.get("cold_open", "") or "").strip()
+    pres = str(data.get("presentacion_invitado", "") or "").strip()
+    return cold, pres
+
+def _generar_seguimiento(client: OpenAI, transcript: str) -> Tuple[str, str]:
+    """
+    Pregunta de seguimiento y su respuesta en UNA sola llamada con envoltorio
+    JSON: las dos idas y vueltas de red de cada seguimiento pasan a una y el
+    prefijo compartido del prompt no se reenvía dos veces. La respuesta
+    depende de la pregunta, pero ambas salen del mismo contexto, así que el
+    modelo puede encadenarlas dentro de la misma generación.
+    """
+    instr = (
+        f"{transcript}\n\n"
+        "Devuelve SOLO un objeto JSON con las claves 'pregunta' y 'respuesta'.\n"
+        f"- pregunta: UNA sola pregunta de seguimiento breve, incisiva y específica de {presentador}, "
+        "basada en la última respuesta, sin prefijo de nombre.\n"
+        f"- respuesta: la respuesta de {entrevistado} a esa pregunta, en su voz, sin prefijo de nombre."
+    )
+    resp = client.chat.completions.create(
+        model=modelo,
+        temperature=temperatura,
+        top_p=0.95,
+        frequency_penalty=0.25,
+        presence_penalty=0.0,
+        response_format={"type": "json_object"},
+        extra_body=_extra_cache_prompt(),
+        messages=[
+            _mensaje_sistema(),
+            {"role": "user", "content": instr}
+        ]
+    )
+    try:
+        data = json.loads(resp.choices[0].message.content)
+    except Exception:
+        data = {}
+    return (
+        str(data.get("pregunta", "") or "").strip(),
+        str(data.get("respuesta", "") or "").strip(),
+    )
+
 
 # ---------------------------------------------------------------------
 # Helper: exportar segmentos JSON para TTS/subtítulos
 # ---------------------------------------------------------------------
-def _save_segments_json(outdir: str, basename: str, items: List[Tuple[str, str]]) -> str:
+def _save_segments_json(outdir: str, basename: str, oradores: List[str], lineas: List[str]) -> str:
     """
     Exporta un JSON con segmentos para el nuevo pipeline TTS/subtítulos.
     Estructura: [{"speaker": "...", "text": "..."}...]
@@ -563,9 +816,10 @@ def _save_segments_json(outdir: str, basename: str, items: List[Tuple[str, str]]
     - Aplica el filtro de emojis (solo los expresivos permitidos, máx. 1 por frase)
     """
     segs = []
-    for who, txt in items:
-        # Aseguramos el mismo postproceso anti-emoji decorativo que usamos al guardar
-        clean = _limit_emoji_per_sentence(_filtra_emojis(txt), max_per_sentence=1)
+    for who, txt in zip(oradores, lineas):
+        # Mismo postproceso anti-emoji decorativo que al guardar, salvo que
+        # el texto ya venga marcado como limpio del pipeline
+        clean = txt if isinstance(txt, _CleanStr) else _clean_emojis(txt, max_per_sentence=1)
         if who.upper() == "COLD OPEN":
             segs.append({"speaker": "Narrator", "text": clean})
         else:
@@ -580,24 +834,28 @@ def _save_segments_json(outdir: str, basename: str, items: List[Tuple[str, str]]
             segs.append({"speaker": speaker, "text": clean})
 
     seg_path = os.path.join(outdir, f"{basename}_segments.json")
-    with open(seg_path, "w", encoding="utf-8", newline="\n") as f:
-        json.dump(segs, f, ensure_ascii=False, indent=2)
+    # write_bytes evita además la traducción de saltos de línea del modo texto
+    Path(seg_path).write_bytes(_json_dumps_bytes(segs))
     return seg_path
 
 # ---------------------------------------------------------------------
 # Exportadores
+# Escriben por entrada sobre el fichero abierto (el buffer de io hace el
+# resto): nunca se materializa el guion completo como una segunda cadena
+# en memoria, que era el pico de los formatos con join.
 # ---------------------------------------------------------------------
 
-def _to_markdown(tema: str, items: List[Tuple[str, str]]) -> str:
+def _write_markdown(f, tema: str, oradores: List[str], lineas: List[str]) -> None:
     fecha = datetime.now().strftime("%Y-%m-%d")
-    cabecera = f"# chIArlando — {tema}\n\n*Grabado: {fecha}*\n\n"
-    cuerpo = "\n\n".join(f"**{orador}**: {texto}" for orador, texto in items)
-    return cabecera + cuerpo + "\n"
+    f.write(f"# chIArlando — {tema}\n\n*Grabado: {fecha}*\n")
+    for orador, texto in zip(oradores, lineas):
+        f.write(f"\n**{orador}**: {texto}\n")
 
-def _to_txt(items: List[Tuple[str, str]]) -> str:
-    return "\n".join(f"{orador}: {texto}" for orador, texto in items) + "\n"
+def _write_txt(f, oradores: List[str], lineas: List[str]) -> None:
+    for orador, texto in zip(oradores, lineas):
+        f.write(f"{orador}: {texto}\n")
 
-def _to_srt(items: List[Tuple[str, str]]) -> str:
+def _write_srt(f, oradores: List[str], lineas: List[str]) -> None:
     """SRT aproximando tiempos por número de palabras (para fallback rápido)."""
     def fmt_ts(segundos: float) -> str:
         ms = int((segundos - int(segundos)) * 1000)
@@ -606,28 +864,23 @@ def _to_srt(items: List[Tuple[str, str]]) -> str:
         h = int(segundos) // 3600
         return f"{h:02}:{m:02}:{s:02},{ms:03}"
 
-    srt = []
     t = 0.0
-    idx = 1
-    for (orador, texto) in items:
-        palabras = max(1, len(re.findall(r"\w+", texto)))
+    for idx, (orador, texto) in enumerate(zip(oradores, lineas), 1):
+        # finditer: cuenta sin materializar la lista de matches
+        palabras = max(1, sum(1 for _ in _RE_WORD.finditer(texto)))
         dur = max(2.0, palabras / 2.666)  # ≈160 wpm
-        start = t
         end = t + dur
-        bloque = f"{idx}\n{fmt_ts(start)} --> {fmt_ts(end)}\n{orador}: {texto}\n"
-        srt.append(bloque)
-        idx += 1
+        f.write(f"{idx}\n{fmt_ts(t)} --> {fmt_ts(end)}\n{orador}: {texto}\n\n")
         t = end + 0.25
-    return "\n".join(srt) + "\n"
 
 def _ensure_outdir(slug: str) -> str:
     outdir = os.path.join("outputs", slug)
     os.makedirs(outdir, exist_ok=True)
     return outdir
 
-def _guardar(tema: str, items: List[Tuple[str, str]], formato: str) -> str:
+def _guardar(tema: str, oradores: List[str], lineas: List[str], formato: str) -> str:
     # 0) NORMALIZADOR FINAL (garantiza que TODO lo que se guarda trae emojis/pausas si existen)
-    items = _normalize_final_items(items)
+    lineas = _normalize_final_lines(lineas)
 
     # Usar slug/basename configurables para no depender del valor visible de 'tema'
     slug = _get_output_slug()
@@ -640,29 +893,30 @@ def _guardar(tema: str, items: List[Tuple[str, str]], formato: str) -> str:
     if legacy_slug != slug and os.path.isdir(legacy_outdir):
         print(f"{Fore.YELLOW}[AVISO]{Style.RESET_ALL} Existe carpeta legacy de outputs: '{legacy_outdir}'. Usando la configurada: '{outdir}'.")
 
-    # 1) Render del contenido según formato
+    # 1) + 2) Render y escritura robusta (LF) en streaming según formato
     if formato == "md":
-        contenido = _to_markdown(tema, items)
         fname = base + ".md"
         encoding = "utf-8"        # MD: sin BOM
     elif formato == "srt":
-        contenido = _to_srt(items)
         fname = base + ".srt"
         encoding = "utf-8"        # SRT: sin BOM
     else:
-        contenido = _to_txt(items)
         fname = base + ".txt"
         # TXT: usa BOM por compat con visores quisquillosos (Windows Notepad clásico, etc.)
         use_bom = bool(config.get("txt_utf8_bom", True))
         encoding = "utf-8-sig" if use_bom else "utf-8"
 
-    # 2) Escritura robusta (LF)
     with open(fname, "w", encoding=encoding, newline="\n") as f:
-        f.write(contenido)
+        if formato == "md":
+            _write_markdown(f, tema, oradores, lineas)
+        elif formato == "srt":
+            _write_srt(f, oradores, lineas)
+        else:
+            _write_txt(f, oradores, lineas)
 
     # 2b) Exportar segmentos JSON para el pipeline (TTS/subs)
     try:
-        _save_segments_json(outdir, os.path.basename(base), items)
+        _save_segments_json(outdir, os.path.basename(base), oradores, lineas)
     except Exception as e:
         print(f"{Fore.YELLOW}[WARN]{Style.RESET_ALL} No se pudo crear segments.json: {e}")
 
@@ -675,8 +929,11 @@ def _guardar(tema: str, items: List[Tuple[str, str]], formato: str) -> str:
 # Conversación principal
 # ---------------------------------------------------------------------
 
+@functools.lru_cache(maxsize=1)
 def _mensajes_base() -> dict:
-    # Textos configurables con placeholders
+    # Textos configurables con placeholders; las plantillas y sus variables
+    # son fijas durante el proceso, así que se renderizan una sola vez
+    # aunque generar_podcast se invoque repetidamente (p. ej. en un servidor).
     bienvenida_tpl   = textos.get("bienvenida", "¡Hola a todos y bienvenidos a un nuevo episodio de 'chIArlando'! Hoy el tema es **{tema}**. Tenemos a {entrevistado} con nosotros. ¡Bienvenido, {entrevistado}!")
     cierre_previo_tpl= textos.get("cierre_previo", "Ha sido una charla fantástica sobre **{tema}**. Antes de cerrar, {entrevistado}, ¿te gustaría dejar una última reflexión breve?")
     cierre_final_tpl = textos.get("cierre_final", "🎙️ Gracias por escucharnos. Si te ha gustado, compártelo y deja tu valoración. ¡Hasta la próxima!")
@@ -684,17 +941,49 @@ def _mensajes_base() -> dict:
     bienvenida = bienvenida_tpl.format(tema=tema, entrevistado=entrevistado, presentador=presentador)
     cierre_previo = cierre_previo_tpl.format(tema=tema, entrevistado=entrevistado, presentador=presentador)
     cierre_final = cierre_final_tpl.format(tema=tema, entrevistado=entrevistado, presentador=presentador)
-    print(f"{Fore.CYAN}[TEXTOS]{Style.RESET_ALL} Plantillas activas: {list(textos.keys())}")
+    if _DEBUG:
+        print(f"{Fore.CYAN}[TEXTOS]{Style.RESET_ALL} Plantillas activas: {list(textos.keys())}")
     return {
         "bienvenida": bienvenida,
         "cierre_previo": cierre_previo,
         "cierre_final": cierre_final
     }
 
+# Caché por (tema, modelo) del lote de preguntas generado: en invocaciones
+# repetidas del mismo episodio se ahorra una llamada completa a OpenAI.
+_preguntas_cache: dict = {}
+
+# Réplica en disco de la caché anterior: la misma pareja (tema, modelo)
+# produce la misma petición, así que en ejecuciones posteriores del mismo
+# tema la llamada se sustituye por una lectura de JSON. Se desactiva con
+# la variable de entorno PODCAST_SIN_CACHE=1.
+_PREGUNTAS_CACHE_PATH = ".preguntas_cache.json"
+
+@functools.lru_cache(maxsize=1)
+def _preguntas_disco() -> dict:
+    if os.environ.get("PODCAST_SIN_CACHE"):
+        return {}
+    try:
+        return _json_loads(Path(_PREGUNTAS_CACHE_PATH).read_bytes())
+    except Exception:
+        return {}
+
 def _generar_preguntas_si_faltan(client: OpenAI) -> List[str]:
     if preguntas_guia:
         return preguntas_guia
 
+    clave = (tema, modelo)
+    cacheadas = _preguntas_cache.get(clave)
+    if cacheadas is not None:
+        return cacheadas
+
+    disco = _preguntas_disco()
+    clave_disco = f"{modelo}|{tema}"
+    cacheadas = disco.get(clave_disco)
+    if cacheadas is not None:
+        _preguntas_cache[clave] = cacheadas
+        return cacheadas
+
     prompt = (
         f"Propón 6–8 preguntas concretas y profundas sobre '{tema}' para una entrevista estilo 'The Wild Project'. "
         f"Mezcla ángulos: técnico, humano, práctica diaria, polémica respetuosa, futuro y ética. "
@@ -706,6 +995,7 @@ def _generar_preguntas_si_faltan(client: OpenAI) -> List[str]:
         top_p=0.95,
         frequency_penalty=0.25,
         presence_penalty=0.0,
+        extra_body=_extra_cache_prompt(),
         messages=[
             {"role": "system", "content": "Eres productor de podcasts: diseñas entrevistas potentes y memorables."},
             {"role": "user", "content": prompt}
@@ -715,7 +1005,7 @@ def _generar_preguntas_si_faltan(client: OpenAI) -> List[str]:
     lineas = [l.strip(" -\t") for l in resp.splitlines() if l.strip()]
     candidatas = []
     for l in lineas:
-        l = re.sub(r"^\d+[\).\s]+", "", l).strip()
+        l = _RE_NUM_PREFIX.sub("", l).strip()
         if len(l) > 8:
             candidatas.append(l)
     if not candidatas:
@@ -727,7 +1017,20 @@ def _generar_preguntas_si_faltan(client: OpenAI) -> List[str]:
             f"¿Cuál ha sido tu mayor cambio de opinión sobre {tema}?",
             f"¿Qué tendencia ves venir que casi nadie mira todavía?"
         ]
-    return candidatas[:8]
+    _preguntas_cache[clave] = candidatas[:8]
+    if not os.environ.get("PODCAST_SIN_CACHE"):
+        disco[clave_disco] = candidatas[:8]
+        try:
+            Path(_PREGUNTAS_CACHE_PATH).write_bytes(_json_dumps_bytes(disco))
+        except Exception:
+            pass  # la caché en disco es oportunista: sin disco, sin drama
+    return _preguntas_cache[clave]
+
+def _imprime_turno(color: str, orador: str, texto: str) -> None:
+    """Emite el turno en UN solo write + un flush. print(..., flush=True)
+    hacía dos write(2) (texto y fin de línea) más el flush por cada turno."""
+    sys.stdout.write(f"\n{color}{orador}: {texto}{Style.RESET_ALL}\n\n")
+    sys.stdout.flush()
 
 def generar_podcast(api_key: str) -> str:
     if not api_key:
@@ -741,101 +1044,146 @@ def generar_podcast(api_key: str) -> str:
 
     client = _client(api_key)
     base = _mensajes_base()
-    guia = _generar_preguntas_si_faltan(client)
+
+    # Ventana rodante de contexto: al LLM solo se le envían los últimos
+    # 'contexto_turnos' renglones. El prompt deja de crecer linealmente con
+    # el episodio (menos tokens facturados y menos latencia por turno) y el
+    # join por llamada queda acotado a O(ventana).
+    transcript_tail: deque = deque(maxlen=max(2, contexto_turnos))
+    # Tamaño de la ventana (len + salto de línea por renglón) mantenido de
+    # forma incremental: el presupuesto se comprueba sin re-sumar la ventana
+    # entera en cada llamada.
+    ctx_len = 0
+
+    def _anota(linea: str) -> None:
+        nonlocal ctx_len
+        if len(transcript_tail) == transcript_tail.maxlen:
+            ctx_len -= len(transcript_tail[0]) + 1
+        transcript_tail.append(linea)
+        ctx_len += len(linea) + 1
+
+    # Líneas ya formateadas "Orador: texto": el valor de retorno en modo
+    # sin guardado sale de aquí con un join, sin el re-formateo de _write_txt
+    # (la línea se construye una única vez por turno y se comparte con el
+    # contexto del LLM).
+    lines_out: List[str] = []
+
+    def _registra(orador: str, texto: str, en_contexto: bool = True) -> None:
+        linea = f"{orador}: {texto}"
+        lines_out.append(linea)
+        guion_oradores.append(orador)
+        guion_lineas.append(texto)
+        if en_contexto:
+            _anota(linea)
+
+    # Presupuesto de tokens del prompt aproximado por caracteres (~4 por
+    # token en castellano): si unas intervenciones muy largas desbordan la
+    # ventana, se descartan los renglones más antiguos antes del join.
+    max_ctx_chars = contexto_turnos * 400
+
+    def _contexto() -> str:
+        nonlocal ctx_len
+        while len(transcript_tail) > 2 and ctx_len > max_ctx_chars:
+            ctx_len -= len(transcript_tail.popleft()) + 1
+        return "\n".join(transcript_tail)
+
+    # Transcripción en dos listas paralelas (struct-of-arrays): los
+    # exportadores las recorren por columnas con zip, sin una tupla por turno.
+    guion_oradores: List[str] = []
+    guion_lineas: List[str] = []
+
+    # Las preguntas guía y la apertura no dependen entre sí: se lanzan en
+    # paralelo para solapar sus dos latencias de red (el resto del diálogo
+    # sí es estrictamente secuencial, cada turno depende del anterior).
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        guia_future = pool.submit(_generar_preguntas_si_faltan, client)
+
+        # 1) Apertura: cold open + presentación del invitado en UNA llamada
+        cold, texto_aura = _generar_apertura(client)
+
+        guia = guia_future.result()
     if dev_mode:
         guia = guia[:1]  # solo la primera pregunta
 
-    transcript: List[str] = []
-    guion: List[Tuple[str, str]] = []
-
-    # 1) Cold open
-    if incluir_cold_open:
-        instr = (
-            f"Prepara un 'cold open' de 1–2 frases SOBRE el tema '{tema}'. "
-            "Debe sonar intrigante y sugerente, pero concreto. "
-            "Menciona explícitamente el tema y no cambies a otros ámbitos. "
-            "No presentes a nadie aún. Evita clichés y evita cualquier referencia técnica a IA."
-        )
-        cold = client.chat.completions.create(
-            model=modelo,
-            temperature=0.9,
-            top_p=0.95,
-            frequency_penalty=0.25,
-            presence_penalty=0.0,
-            messages=[
-                {"role": "system", "content": _sistema_global()},
-                {"role": "user", "content": instr}
-            ]
-        ).choices[0].message.content.strip()
+    if incluir_cold_open and cold:
         cold = _limpia_robotismos(cold)
         cold = enriquecer_dialogo(cold)  # NUEVO
         if cold.endswith("?") and len(cold) > 120:
-            cold = cold.rstrip(" ?") + "."
-        print(f"\n{Fore.CYAN}[COLD OPEN]{Style.RESET_ALL} {cold}\n", flush=True)
-        guion.append(("COLD OPEN", cold))
+            cold = _RE_FIN_COLD.sub(".", cold, count=1)
+        sys.stdout.write(f"\n{Fore.CYAN}[COLD OPEN]{Style.RESET_ALL} {cold}\n\n")
+        sys.stdout.flush()
+        _registra("COLD OPEN", cold, en_contexto=False)
 
     # 2) Intro
     bienvenida = base["bienvenida"]
-    print(f"\n{Fore.BLUE}{presentador}: {bienvenida}{Style.RESET_ALL}\n", flush=True)
-    transcript.append(f"{presentador}: {bienvenida}")
-    guion.append((presentador, bienvenida))
+    _imprime_turno(Fore.BLUE, presentador, bienvenida)
+    _registra(presentador, bienvenida)
 
-    # 3) Presentación invitado
-    nota_intro = "\n\nNota: Es el primer turno del invitado. Preséntate brevemente y saluda a la audiencia."
-    texto_aura = _llm_siguiente_linea(client, "\n".join(transcript) + nota_intro, entrevistado)
-    print(f"\n{Fore.GREEN}{entrevistado}: {texto_aura}{Style.RESET_ALL}\n", flush=True)
-    transcript.append(f"{entrevistado}: {texto_aura}")
-    guion.append((entrevistado, texto_aura))
+    # 3) Presentación invitado (del envoltorio; si vino vacía, turno normal)
+    if texto_aura:
+        texto_aura = _postprocesa_turno(texto_aura, entrevistado)
+    else:
+        nota_intro = "\n\nNota: Es el primer turno del invitado. Preséntate brevemente y saluda a la audiencia."
+        texto_aura = _llm_siguiente_linea(client, _contexto() + nota_intro, entrevistado)
+    _imprime_turno(Fore.GREEN, entrevistado, texto_aura)
+    _registra(entrevistado, texto_aura)
 
     # 4) Bloques principales: primero TODAS las preguntas_guia
+    # Plan de seguimientos precomputado: el nº de llamadas del episodio queda
+    # decidido antes de entrar al bucle (una tirada del RNG por bloque, juntas).
+    if dev_mode:
+        follow_plan = [0] * len(guia)
+    else:
+        seg_min, seg_max = preguntas_improvisadas
+        follow_plan = [random.randint(seg_min, seg_max) for _ in guia]
+
     turnos_generados = 1  # ya respondió 1 vez (presentación)
-    for pregunta in guia:
+    for pregunta, n_follow in zip(guia, follow_plan):
         if turnos_generados >= max_turnos:
             break
 
         # Héctor pregunta (de la guía)
         pregunta_directa = _recorta_preambulos_en_preguntas(pregunta.strip())
-        if not pregunta_directa.endswith("?"):
-            pregunta_directa = pregunta_directa.rstrip(".") + "?"
+        pregunta_directa = _asegura_interrogacion(pregunta_directa)
         pregunta_directa = enriquecer_dialogo(pregunta_directa)  # NUEVO (pausas sutiles)
-        print(f"\n{Fore.BLUE}{presentador}: {pregunta_directa}{Style.RESET_ALL}\n", flush=True)
-        transcript.append(f"{presentador}: {pregunta_directa}")
-        guion.append((presentador, pregunta_directa))
+        _imprime_turno(Fore.BLUE, presentador, pregunta_directa)
+        _registra(presentador, pregunta_directa)
 
         # Aura responde
-        resp_aura = _llm_siguiente_linea(client, "\n".join(transcript), entrevistado)
-        print(f"\n{Fore.GREEN}{entrevistado}: {resp_aura}{Style.RESET_ALL}\n", flush=True)
-        transcript.append(f"{entrevistado}: {resp_aura}")
-        guion.append((entrevistado, resp_aura))
+        resp_aura = _llm_siguiente_linea(client, _contexto(), entrevistado)
+        _imprime_turno(Fore.GREEN, entrevistado, resp_aura)
+        _registra(entrevistado, resp_aura)
         turnos_generados += 1
 
-        # Seguimientos improvisados tras la respuesta de Aura
-        seg_min, seg_max = preguntas_improvisadas
-        if dev_mode:
-            n_follow = 0
-        else:
-            n_follow = random.randint(seg_min, seg_max)
+        # Seguimientos improvisados (según el plan) tras la respuesta de Aura.
+        # El presupuesto restante se salda de una vez: ninguna iteración
+        # arranca si el tope de turnos la va a descartar.
+        n_follow = min(n_follow, max(0, max_turnos - turnos_generados))
         for _ in range(n_follow):
-            if turnos_generados >= max_turnos:
-                break
-            prompt_follow = (
-                "\n".join(transcript)
-                + "\n\nNota: formula UNA sola pregunta de seguimiento breve, incisiva y específica basada en la última respuesta."
-            )
-            follow = _llm_siguiente_linea(client, prompt_follow, presentador)
+            # Pregunta y respuesta en una llamada; si el envoltorio JSON
+            # vino vacío, se recae en el camino de turno a turno clásico.
+            follow, resp_aura2 = _generar_seguimiento(client, _contexto())
+            if follow:
+                follow = _postprocesa_turno(follow, presentador)
+            else:
+                prompt_follow = (
+                    _contexto()
+                    + "\n\nNota: formula UNA sola pregunta de seguimiento breve, incisiva y específica basada en la última respuesta."
+                )
+                follow = _llm_siguiente_linea(client, prompt_follow, presentador, kind="follow")
             follow = _recorta_preambulos_en_preguntas(follow)
-            if not follow.strip().endswith("?"):
-                follow = follow.rstrip(".") + "?"
+            follow = _asegura_interrogacion(follow)
             follow = enriquecer_dialogo(follow)  # NUEVO
-            print(f"\n{Fore.BLUE}{presentador}: {follow}{Style.RESET_ALL}\n", flush=True)
-            transcript.append(f"{presentador}: {follow}")
-            guion.append((presentador, follow))
+            _imprime_turno(Fore.BLUE, presentador, follow)
+            _registra(presentador, follow)
 
             # Respuesta de Aura
-            resp_aura2 = _llm_siguiente_linea(client, "\n".join(transcript), entrevistado)
-            print(f"\n{Fore.GREEN}{entrevistado}: {resp_aura2}{Style.RESET_ALL}\n", flush=True)
-            transcript.append(f"{entrevistado}: {resp_aura2}")
-            guion.append((entrevistado, resp_aura2))
+            if resp_aura2:
+                resp_aura2 = _postprocesa_turno(resp_aura2, entrevistado)
+            else:
+                resp_aura2 = _llm_siguiente_linea(client, _contexto(), entrevistado)
+            _imprime_turno(Fore.GREEN, entrevistado, resp_aura2)
+            _registra(entrevistado, resp_aura2)
             turnos_generados += 1
 
         if dev_mode:
@@ -843,18 +1191,17 @@ def generar_podcast(api_key: str) -> str:
 
     # 5) Cierre
     cierre_previo = base["cierre_previo"]
-    print(f"\n{Fore.MAGENTA}{presentador}: {cierre_previo}{Style.RESET_ALL}\n", flush=True)
-    transcript.append(f"{presentador}: {cierre_previo}")
-    guion.append((presentador, cierre_previo))
+    _imprime_turno(Fore.MAGENTA, presentador, cierre_previo)
+    _registra(presentador, cierre_previo)
 
     reflexion = _llm_siguiente_linea(
         client,
-        "\n".join(transcript) + f"\n\nNota: comparte una última reflexión sobre {tema}, cálida y breve.",
-        entrevistado
+        _contexto() + f"\n\nNota: comparte una última reflexión sobre {tema}, cálida y breve.",
+        entrevistado,
+        kind="reflexion"
     )
-    print(f"\n{Fore.GREEN}{entrevistado}: {reflexion}{Style.RESET_ALL}\n", flush=True)
-    transcript.append(f"{entrevistado}: {reflexion}")
-    guion.append((entrevistado, reflexion))
+    _imprime_turno(Fore.GREEN, entrevistado, reflexion)
+    _registra(entrevistado, reflexion)
 
     cierre_final = base["cierre_final"]
     if incluir_cierre_llamado:
@@ -862,24 +1209,26 @@ def generar_podcast(api_key: str) -> str:
         if cta:
             cierre_final += cta.format(tema=tema, entrevistado=entrevistado, presentador=presentador)
     # Cierre estático ya trae emojis
-    print(f"\n{Fore.MAGENTA}{presentador}: {cierre_final}{Style.RESET_ALL}\n", flush=True)
-    transcript.append(f"{presentador}: {cierre_final}")
-    guion.append((presentador, cierre_final))
+    _imprime_turno(Fore.MAGENTA, presentador, cierre_final)
+    _registra(presentador, cierre_final)
 
     # 6) Guardado respetando formato_guardado (UTF-8)
     salida = ""
     if guardar_guion_flag:
-        fname = _guardar(tema, guion, formato_guardado)
+        fname = _guardar(tema, guion_oradores, guion_lineas, formato_guardado)
         print(f"\n{Fore.YELLOW}Guion guardado como {fname}{Style.RESET_ALL}")
         salida = fname
 
-    return _to_txt(guion) if not salida else f"Archivo guardado: {salida}"
+    return "\n".join(lines_out) + "\n" if not salida else f"Archivo guardado: {salida}"
 
 
-def _normalize_final_items(items: List[tuple]) -> List[tuple]:
+def _normalize_final_lines(lineas: List[str]) -> List[str]:
     norm = []
-    for (orador, texto) in items:
+    for texto in lineas:
+        if isinstance(texto, _CleanStr):
+            # ya pasó por enriquecer_dialogo + filtro: no hay nada que rehacer
+            norm.append(texto)
+            continue
         t = enriquecer_dialogo(texto)  # último pase anti-planicie y pro-emoji
-        t = _limit_emoji_per_sentence(_filtra_emojis(t), max_per_sentence=1)
-        norm.append((orador, t))
+        norm.append(t)
     return norm
\ No newline at end of file